@@ -0,0 +1,149 @@
+# Shared helpers for the CLI workflows (main_call.py, summarize.py) and the Flask server.
+
+import os
+import sqlite3
+import hashlib
+import io
+import json
+from functools import lru_cache
+from langchain_ollama import OllamaLLM
+import numpy as np
+import scipy.sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from extract_text import extract_text_from_pdf
+from db_setup import _chunk_text_iter
+
+DATABASE = 'embeddings_metadata.db'
+
+
+# ---- DATABASE ----
+def get_db_connection():
+    """Establish a connection to the SQLite database."""
+    conn = sqlite3.connect(DATABASE)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+def find_document(db_conn, document_hash):
+    """Return the id of the stored document with this content hash, or None.
+
+    A plain read, so requests for documents we already have never take the write lock.
+    """
+    document = db_conn.execute(
+        "SELECT id FROM documents WHERE document_hash = ?", (document_hash,)
+    ).fetchone()
+    return document['id'] if document else None
+
+
+def register_document(db_conn, name, document_hash):
+    """Insert a new document; return (document_id, is_new).
+
+    is_new is False when another connection stored the same content first. The insert
+    opens a write transaction, so commit as soon as the document has been processed.
+    """
+    document = db_conn.execute(
+        "INSERT INTO documents (name, document_hash) VALUES (?, ?) "
+        "ON CONFLICT(document_hash) DO NOTHING RETURNING id",
+        (name, document_hash)
+    ).fetchone()
+    if document is not None:
+        return document['id'], True
+    return find_document(db_conn, document_hash), False
+
+
+# ---- DOCUMENT HASHING ----
+def hash_file(file_path):
+    """Generate a SHA256 hash of a file's bytes."""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+# ---- PDF PROCESSING ----
+def process_pdf(pdf_path, db_conn, document_id):
+    """Extract text from PDF, chunk it, and store it in the database with document_id."""
+    if not os.path.exists(pdf_path):
+        print(f"❌ Error: PDF file '{pdf_path}' not found.")
+        return
+    
+    print("📄 Extracting text from PDF...")
+    extracted_text = extract_text_from_pdf(pdf_path)
+    process_text(extracted_text, db_conn, document_id)
+
+
+def process_text(extracted_text, db_conn, document_id):
+    """Chunk already-extracted text, store it with document_id and build its TF-IDF index."""
+    print("🔄 Chunking text and storing in database...")
+    cursor = db_conn.cursor()
+    cursor.executemany(
+        "INSERT INTO chunks (document_id, chunk) VALUES (?, ?)",
+        ((document_id, chunk) for chunk in _chunk_text_iter(extracted_text, max_tokens=500, overlap=50))
+    )
+    
+    # Fit the TF-IDF index from the stored rows instead of keeping a second copy in memory
+    stored_chunks = (row[0] for row in db_conn.execute(
+        "SELECT chunk FROM chunks WHERE document_id = ? ORDER BY id", (document_id,)
+    ))
+    store_tfidf_index(db_conn, document_id, stored_chunks)
+    db_conn.execute("UPDATE documents SET processed_at = CURRENT_TIMESTAMP WHERE id = ?", (document_id,))
+    db_conn.commit()
+    print("✅ PDF processing complete: Text extracted, chunked, and stored in DB.")
+
+
+# ---- TF-IDF INDEX PERSISTENCE ----
+def build_tfidf_index(chunks):
+    """Fit a TF-IDF vectorizer on a document's chunks and return it with the chunk matrix."""
+    vectorizer = TfidfVectorizer(norm='l2')
+    chunk_matrix = vectorizer.fit_transform(chunks)
+    return vectorizer, chunk_matrix
+
+
+def store_tfidf_index(db_conn, document_id, chunks):
+    """Fit and persist the TF-IDF index for a document alongside its row in `documents`.
+
+    `chunks` may be any iterable (e.g. a generator over database rows); it is consumed once.
+    """
+    try:
+        vectorizer, chunk_matrix = build_tfidf_index(chunks)
+    except ValueError:
+        # Nothing to index: no chunks, or no terms in them
+        return None, None
+    # Store plain data (terms in column order, IDF weights, sparse matrix) rather than a
+    # pickled sklearn object, so the index survives sklearn upgrades
+    vocab = json.dumps(vectorizer.get_feature_names_out().tolist())
+    idf_buffer = io.BytesIO()
+    np.save(idf_buffer, vectorizer.idf_)
+    matrix_buffer = io.BytesIO()
+    scipy.sparse.save_npz(matrix_buffer, chunk_matrix.tocsr())
+    db_conn.execute(
+        "UPDATE documents SET vocab = ?, idf = ?, chunk_matrix = ? WHERE id = ?",
+        (vocab, idf_buffer.getvalue(), matrix_buffer.getvalue(), document_id)
+    )
+    return vectorizer, chunk_matrix
+
+
+def load_tfidf_index(db_conn, document_id):
+    """Load a document's persisted TF-IDF index, or (None, None) if it had nothing to index."""
+    row = db_conn.execute(
+        "SELECT vocab, idf, chunk_matrix FROM documents WHERE id = ?",
+        (document_id,)
+    ).fetchone()
+    if row is None or None in tuple(row):
+        return None, None
+
+    # A fixed vocabulary plus the stored IDF weights is a ready-to-use vectorizer; no fitting
+    vectorizer = TfidfVectorizer(vocabulary=json.loads(row[0]), norm='l2')
+    vectorizer.idf_ = np.load(io.BytesIO(row[1]))
+    chunk_matrix = scipy.sparse.load_npz(io.BytesIO(row[2]))
+    return vectorizer, chunk_matrix
+
+
+# ---- LANGUAGE MODEL ----
+@lru_cache(maxsize=32)
+def load_model(model_name: str):
+    """Load the Ollama language model."""
+    print(f"🤖 Loading model: {model_name}")
+    return OllamaLLM(model=model_name)
@@ -1,8 +1,28 @@
 import sqlite3
 import json
+from functools import lru_cache
 import nltk
 
-nltk.download('punkt')
+# Only reach out to the network when the Punkt models are missing
+# (newer NLTK releases load them from punkt_tab)
+for resource, package in (('tokenizers/punkt', 'punkt'), ('tokenizers/punkt_tab', 'punkt_tab')):
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        nltk.download(package, quiet=True)
+
+
+# Documents are identified by document_hash alone; different files may share a name
+DOCUMENTS_SCHEMA = '''(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    document_hash TEXT UNIQUE,
+    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    vocab TEXT,
+    idf BLOB,
+    chunk_matrix BLOB,
+    processed_at TIMESTAMP
+)'''
 
 
 def init_db():
@@ -13,14 +33,29 @@ def init_db():
         c = conn.cursor()
         
         # Create documents table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                document_hash TEXT UNIQUE,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        c.execute(f"CREATE TABLE IF NOT EXISTS documents {DOCUMENTS_SCHEMA}")
+        
+        # Add TF-IDF index and processing columns to databases created before they existed
+        existing_columns = {row[1] for row in c.execute("PRAGMA table_info(documents)")}
+        for column, column_type in (
+            ("vocab", "TEXT"), ("idf", "BLOB"), ("chunk_matrix", "BLOB"), ("processed_at", "TIMESTAMP")
+        ):
+            if column not in existing_columns:
+                c.execute(f"ALTER TABLE documents ADD COLUMN {column} {column_type}")
+        
+        # Older databases made documents.name UNIQUE, so two different files with the same
+        # name could not both be stored. SQLite cannot drop a constraint in place, so rebuild
+        # the table (ids are kept, which keeps chunks and embeddings pointing at their rows).
+        documents_sql = c.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'documents'"
+        ).fetchone()[0]
+        if "name TEXT UNIQUE" in documents_sql:
+            columns = "id, name, document_hash, uploaded_at, vocab, idf, chunk_matrix, processed_at"
+            c.execute("DROP TABLE IF EXISTS documents_rebuild")
+            c.execute(f"CREATE TABLE documents_rebuild {DOCUMENTS_SCHEMA}")
+            c.execute(f"INSERT INTO documents_rebuild ({columns}) SELECT {columns} FROM documents")
+            c.execute("DROP TABLE documents")
+            c.execute("ALTER TABLE documents_rebuild RENAME TO documents")
         
         # Create chunks table
         c.execute('''
@@ -45,7 +80,13 @@ def init_db():
             )
         ''')
         
+        # Index the foreign keys used for per-document lookups
+        # (documents.document_hash is UNIQUE, so SQLite already indexes it)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_document_id ON embeddings(document_id)")
+        
         conn.commit()
+        c.execute("PRAGMA optimize")
         print("✅ Database initialized successfully.")
         return conn
     
@@ -80,39 +121,56 @@ def extract_and_store_chunks(text, db_conn, document_id, section="General", page
     if db_conn is None:
         raise ConnectionError("❌ Failed to initialize database connection during chunk extraction.")
     
-    chunks = chunk_text(text, max_tokens=500, overlap=50)
-    
+    # One executemany inside a single transaction: one commit instead of one per chunk.
+    # Chunks are streamed straight into the insert rather than built up as a list.
     cursor = db_conn.cursor()
-    for chunk in chunks:
-        cursor.execute(
-            "INSERT INTO chunks (document_id, chunk) VALUES (?, ?)",
-            (document_id, chunk)
-        )
+    cursor.executemany(
+        "INSERT INTO chunks (document_id, chunk) VALUES (?, ?)",
+        ((document_id, chunk) for chunk in _chunk_text_iter(text, max_tokens=500, overlap=50))
+    )
     db_conn.commit()
     print("✅ Chunks successfully stored in the database.")
 
 
-def chunk_text(text, max_tokens=700, overlap=100):
-    """Split text into chunks with some overlap."""
-    sentences = nltk.tokenize.sent_tokenize(text)
-    chunks = []
+@lru_cache(maxsize=1)
+def _get_sentence_tokenizer():
+    """Load the Punkt sentence tokenizer once per process."""
+    try:
+        return nltk.tokenize.PunktTokenizer("english")
+    except AttributeError:
+        # Older NLTK releases only ship the pickled model
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+
+
+def _chunk_text_iter(text, max_tokens=700, overlap=100):
+    """Yield chunks of text with some overlap, one at a time."""
+    sentences = _get_sentence_tokenizer().tokenize(text)
+    # Word counts are computed once per sentence and reused for the overlap tail.
+    # Counting spaces is a C-level scan with no per-word allocation; it is close enough
+    # to a true word count for deciding chunk boundaries.
+    lengths = [sentence.count(' ') + 1 for sentence in sentences]
     current_chunk = []
+    current_lengths = []
     current_length = 0
 
-    for sentence in sentences:
-        sentence_length = len(sentence.split())
+    for sentence, sentence_length in zip(sentences, lengths):
         if current_length + sentence_length > max_tokens:
-            chunks.append(" ".join(current_chunk))
+            yield " ".join(current_chunk)
             current_chunk = current_chunk[-overlap:]
-            current_length = sum(len(chunk.split()) for chunk in current_chunk)
+            current_lengths = current_lengths[-overlap:]
+            current_length = sum(current_lengths)
 
         current_chunk.append(sentence)
+        current_lengths.append(sentence_length)
         current_length += sentence_length
 
     if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    
-    return chunks
+        yield " ".join(current_chunk)
+
+
+def chunk_text(text, max_tokens=700, overlap=100):
+    """Split text into chunks with some overlap."""
+    return list(_chunk_text_iter(text, max_tokens, overlap))
 
 
 if __name__ == '__main__':
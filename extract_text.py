@@ -1,13 +1,72 @@
-import PyPDF2
+try:
+    from pypdf import PdfReader
+except ImportError:
+    # Fall back to the legacy package name
+    from PyPDF2 import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 import os
 
+# Below this many pages, handing pages to worker processes costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 32
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool():
+    """Create the page-extraction process pool once and reuse it for every PDF.
+
+    Workers are spawned rather than forked: the server extracts from request threads,
+    and forking a multi-threaded process can deadlock.
+    """
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
+
+def _reset_page_pool(pool):
+    """Forget a broken pool so _get_page_pool creates a new one."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False)
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract text from pages [start, stop) of a PDF (runs in a worker process)."""
+    pdf_reader = PdfReader(pdf_path)
+    return "".join(pdf_reader.pages[i].extract_text() or "" for i in range(start, stop))
+
 
 def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
-    text = ""
+    """Extract text from a PDF file, splitting large documents across processes."""
     with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-    return text
+        pdf_reader = PdfReader(file)
+        page_count = len(pdf_reader.pages)
+        workers = min(os.cpu_count() or 1, page_count)
+        if page_count < PARALLEL_PAGE_THRESHOLD or workers < 2:
+            parts = []
+            for page in pdf_reader.pages:
+                parts.append(page.extract_text() or "")
+            return "".join(parts)
+
+    # Each worker reopens the PDF and extracts one contiguous range of pages
+    bounds = [page_count * i // workers for i in range(workers + 1)]
+    pool = _get_page_pool()
+    try:
+        parts = pool.map(_extract_page_range, [pdf_path] * workers, bounds[:-1], bounds[1:])
+        return "".join(parts)
+    except BrokenProcessPool:
+        # A worker died; let the next call start a fresh pool instead of reusing a broken one
+        _reset_page_pool(pool)
+        raise
 
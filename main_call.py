@@ -1,72 +1,26 @@
 # workflow.py
 
-import os
 import sqlite3
-import json
+from functools import lru_cache
 from langchain.prompts import ChatPromptTemplate
-from langchain_ollama import OllamaLLM
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 import sys
-import time
-from db_setup import chunk_text
-# ---- STEP 1: PDF PROCESSING ----
-from extract_text import extract_text_from_pdf
-from db_setup import extract_and_store_chunks
-
-import hashlib
-
-DATABASE = 'embeddings_metadata.db'
-
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def generate_document_hash(document_name, content):
-    """Generate a unique hash for the document based on name and content."""
-    hasher = hashlib.sha256()
-    hasher.update(document_name.encode('utf-8'))
-    hasher.update(content.encode('utf-8'))
-    return hasher.hexdigest()
-
-def process_pdf(pdf_path, db_conn, document_id):
-    """Extract text from PDF, chunk it, and store it in the database with document_id."""
-    if not os.path.exists(pdf_path):
-        print(f"❌ Error: PDF file '{pdf_path}' not found.")
-        return
-    
-    print("📄 Extracting text from PDF...")
-    extracted_text = extract_text_from_pdf(pdf_path)
-    
-    print("🔄 Chunking text and storing in database...")
-    chunks = chunk_text(extracted_text, max_tokens=500, overlap=50)
-    
-    cursor = db_conn.cursor()
-    for chunk in chunks:
-        cursor.execute(
-            "INSERT INTO chunks (document_id, chunk) VALUES (?, ?)",
-            (document_id, chunk)
-        )
-    db_conn.commit()
-    print("✅ PDF processing complete: Text extracted, chunked, and stored in DB.")
-
-
-# ---- STEP 2: LOAD LANGUAGE MODEL ----
-def load_model(model_name: str):
-    """Load the language model."""
-    print(f"🤖 Loading model: {model_name}")
-    return OllamaLLM(model=model_name)
+# ---- STEP 1: PDF PROCESSING / STEP 2: LOAD LANGUAGE MODEL ----
+from common import get_db_connection, process_pdf, load_model
 
 
 # ---- STEP 3: RETRIEVE AND RANK CHUNKS ----
 def fetch_all_chunks(db_conn):
     """Fetch all chunks from the database."""
     c = db_conn.cursor()
+    c.row_factory = lambda cursor, row: row[0]
     c.execute("SELECT chunk FROM embeddings")
-    results = c.fetchall()
-    return [row[0] for row in results]
+    return c.fetchall()
+
+
+# Stateless, so one instance serves every call
+_HASHING_VECTORIZER = HashingVectorizer(n_features=2**18, alternate_sign=False, norm=None)
 
 
 def rank_chunks_by_similarity(query_text, chunks, top_k=5):
@@ -77,23 +31,49 @@ def rank_chunks_by_similarity(query_text, chunks, top_k=5):
     # Combine the query and chunks into one list
     texts = [query_text] + chunks
 
-    # Convert texts into TF-IDF matrix
-    vectorizer = TfidfVectorizer().fit_transform(texts)
+    # Hash terms straight to columns (no vocabulary to build), then apply IDF weighting;
+    # the resulting rows are L2-normalized
+    term_counts = _HASHING_VECTORIZER.transform(texts)
+    tfidf_matrix = TfidfTransformer(norm='l2').fit_transform(term_counts)
 
-    # Compute cosine similarity between the query and all chunks
-    cosine_similarities = cosine_similarity(vectorizer[0:1], vectorizer[1:]).flatten()
+    # Cosine similarity on unit rows is a sparse dot product with the query row; the
+    # query's own score is dropped afterwards rather than copying a sliced chunk matrix
+    cosine_similarities = (tfidf_matrix @ tfidf_matrix[0].T).toarray().ravel()[1:]
     
-    # Rank chunks by similarity score
-    ranked_indices = cosine_similarities.argsort()[-top_k:][::-1]
+    ranked_indices = _top_k_indices(cosine_similarities, top_k)
     ranked_chunks = [chunks[i] for i in ranked_indices]
     
     return ranked_chunks
 
 
+def rank_chunks_with_index(query_text, chunks, vectorizer, chunk_matrix, top_k=5):
+    """Rank chunks against a precomputed TF-IDF index; only the query is vectorized."""
+    if not chunks:
+        return []
+
+    # CSR matrix times a dense query vector yields the dense scores directly,
+    # without building an intermediate sparse result
+    query_vector = vectorizer.transform([query_text]).toarray().ravel()
+    cosine_similarities = chunk_matrix @ query_vector
+
+    ranked_indices = _top_k_indices(cosine_similarities, top_k)
+    return [chunks[i] for i in ranked_indices]
+
+
+def _top_k_indices(scores, top_k):
+    """Return indices of the top_k scores, best first, without a full sort.
+
+    np.argpartition selects the k best in O(N); only those k are then sorted.
+    """
+    k = min(top_k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top_indices = np.argpartition(-scores, k - 1)[:k]
+    return top_indices[np.argsort(-scores[top_indices], kind='stable')]
+
+
 # ---- STEP 4: HANDLE PROMPT WITH MODEL (Streaming Enabled) ----
-def handle_prompt(query_text: str, context_text: str, model, temperature: float, top_p: float, max_length: int):
-    """Handle the query and stream the model response word-by-word."""
-    PROMPT_TEMPLATE = """
+PROMPT_TEMPLATE = """
     Answer the question based only on the following context:
 
     {context}
@@ -102,18 +82,39 @@ def handle_prompt(query_text: str, context_text: str, model, temperature: float,
 
     Answer the question based on the above context: {question}
     """
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-    prompt = prompt_template.format(context=context_text, question=query_text)
+
+
+@lru_cache(maxsize=1)
+def _get_prompt_template():
+    """Parse the question-answering prompt template once."""
+    return ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+
+
+def build_prompt(query_text: str, context_text: str):
+    """Fill the question-answering prompt template."""
+    return _get_prompt_template().format(context=context_text, question=query_text)
+
+
+def stream_prompt(query_text: str, context_text: str, model, temperature: float, top_p: float, max_length: int):
+    """Yield the model response part by part as it is generated."""
+    prompt = build_prompt(query_text, context_text)
+    yield from model.stream(prompt, temperature=temperature, top_p=top_p, max_length=max_length)
+
+
+def handle_prompt(query_text: str, context_text: str, model, temperature: float, top_p: float, max_length: int):
+    """Handle the query, stream the model response to stdout and return the full text."""
     print("📝 Generating response...\n")
     
     # Stream response from the model
-    for part in model.stream(prompt, temperature=temperature, top_p=top_p, max_length=max_length):
+    parts = []
+    for part in stream_prompt(query_text, context_text, model, temperature, top_p, max_length):
         # Print each part (usually a word or sentence fragment) with streaming effect
         sys.stdout.write(part)
         sys.stdout.flush()
-        time.sleep(0.05)  # Add a slight delay for better streaming simulation
+        parts.append(part)
     
     print("\n✅ Response complete.")
+    return "".join(parts)
 
 
 # ---- STEP 5: MAIN WORKFLOW ----
@@ -1,31 +1,18 @@
-from flask import Flask, request, jsonify
-from main_call import process_pdf, fetch_all_chunks, load_model, handle_prompt, rank_chunks_by_similarity,extract_text_from_pdf,extract_and_store_chunks,generate_document_hash
-import sqlite3
-import hashlib
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
+from common import (
+    get_db_connection, hash_file, find_document, register_document, process_text, load_model,
+    load_tfidf_index,
+)
+from extract_text import extract_text_from_pdf
+from main_call import rank_chunks_with_index, stream_prompt
+from db_setup import init_db
 import os
 
-app = Flask(__name__)
-DATABASE = 'embeddings_metadata.db'
-
-
-# --- Utility Functions ---
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def file_hash(file_path):
-    """Generate SHA256 hash for a file."""
-    hasher = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+bp = Blueprint('qa', __name__)
 
 
 # --- Unified Endpoint ---
-@app.route('/process-and-ask', methods=['POST'])
+@bp.route('/process-and-ask', methods=['POST'])
 def process_and_ask():
     pdf_file = request.files['file']
     query = request.form.get('question')
@@ -38,52 +25,74 @@ def process_and_ask():
     pdf_path = f"uploads/{pdf_file.filename}"
     pdf_file.save(pdf_path)
     
-    # Extract text for hashing
-    extracted_text = extract_text_from_pdf(pdf_path)
-    document_hash = generate_document_hash(pdf_file.filename, extracted_text)
+    # Hash the raw file bytes; text is only extracted for documents we have not seen.
+    # Uploads overwrite the same path, so the hash is never taken from a cache.
+    document_hash = hash_file(pdf_path)
     
-    # Database Connection
+    # Database Connection; always closed, and a half-written document is rolled back
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if the document already exists
-    cursor.execute("SELECT id FROM documents WHERE document_hash = ?", (document_hash,))
-    existing_document = cursor.fetchone()
-    
-    if existing_document:
-        document_id = existing_document['id']
-        print("✅ Document already exists. Fetching chunks directly from the database.")
-    else:
-        print("📄 Processing new document...")
+    try:
+        # Documents seen before are found with a plain read, so they never wait on the write lock
+        document_id = find_document(conn, document_hash)
+        if document_id is None:
+            print("📄 Processing new document...")
+            
+            # Extract before inserting so the write transaction is not held while the PDF is parsed
+            extracted_text = extract_text_from_pdf(pdf_path)
+            
+            # Process and store chunks; the new row is only committed once it has been processed
+            document_id, is_new = register_document(conn, pdf_file.filename, document_hash)
+            if is_new:
+                process_text(extracted_text, conn, document_id)
+            conn.commit()
+        else:
+            print("✅ Document already exists. Fetching chunks directly from the database.")
         
-        # Insert document metadata
-        cursor.execute(
-            "INSERT INTO documents (name, document_hash) VALUES (?, ?)",
-            (pdf_file.filename, document_hash)
-        )
-        document_id = cursor.lastrowid
+        # Load the TF-IDF index stored when the document was processed. There is none when
+        # nothing was indexable (no extractable text, or only punctuation).
+        vectorizer, chunk_matrix = load_tfidf_index(conn, document_id)
+        if vectorizer is None:
+            return jsonify({"error": "No chunks found for this document."}), 404
         
-        # Process and store chunks
-        process_pdf(pdf_path, conn, document_id)
-        conn.commit()
-    
-    # Fetch chunks related to this document
-    cursor.execute("SELECT chunk FROM chunks WHERE document_id = ?", (document_id,))
-    chunks = [row['chunk'] for row in cursor.fetchall()]
-    
-    if not chunks:
+        # Fetch chunks related to this document; a scalar row factory returns plain strings
+        # instead of building a sqlite3.Row per chunk
+        chunk_cursor = conn.cursor()
+        chunk_cursor.row_factory = lambda cursor, row: row[0]
+        chunk_cursor.execute("SELECT chunk FROM chunks WHERE document_id = ? ORDER BY id", (document_id,))
+        chunks = chunk_cursor.fetchall()
+        
+        # Rank chunks and generate a response
+        ranked_chunks = rank_chunks_with_index(query, chunks, vectorizer, chunk_matrix, top_k=5)
+        context_text = " ".join(ranked_chunks)
+        
+        conn.execute("PRAGMA optimize")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         conn.close()
-        return jsonify({"error": "No chunks found for this document."}), 404
     
-    # Rank chunks and generate a response
-    ranked_chunks = rank_chunks_by_similarity(query, chunks, top_k=5)
-    context_text = " ".join(ranked_chunks)
+    # Stream the answer to the client as the model produces it
+    return Response(
+        stream_with_context(stream_prompt(query, context_text, current_app.config['MODEL'], 0.7, 0.9, 300)),
+        mimetype='text/plain'
+    )
+
+
+# --- App Factory ---
+def create_app():
+    """Create the Flask app; startup work lives here so importing this module has no side effects."""
+    app = Flask(__name__)
+    
+    # Make sure the schema (including the TF-IDF index columns) is up to date
+    init_db()
     
-    model = load_model("llama3.1")
-    response = handle_prompt(query, context_text, model, 0.7, 0.9, 300)
+    # Shared across requests instead of being rebuilt per call
+    app.config['MODEL'] = load_model("llama3.1")
     
-    conn.close()
-    return jsonify({"response": response})
+    app.register_blueprint(bp)
+    return app
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
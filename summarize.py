@@ -1,67 +1,17 @@
 import os
-import sqlite3
-import hashlib
 import sys
-import time
-from langchain.prompts import ChatPromptTemplate
-from langchain_ollama import OllamaLLM
-from extract_text import extract_text_from_file
-from db_setup import chunk_text
-
-DATABASE = 'embeddings_metadata.db'
-
-
-# ---- Utility Functions ----
-def get_db_connection():
-    """Establish a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def generate_document_hash(document_name, content):
-    """Generate a unique hash for the document based on its name and content."""
-    hasher = hashlib.sha256()
-    hasher.update(document_name.encode('utf-8'))
-    hasher.update(content.encode('utf-8'))
-    return hasher.hexdigest()
-
-
-def process_pdf(pdf_path, db_conn, document_id):
-    """Extract, chunk, and store text from a PDF."""
-    if not os.path.exists(pdf_path):
-        print(f"❌ Error: PDF file '{pdf_path}' not found.")
-        return
-    
-    print("📄 Extracting text from PDF...")
-    extracted_text = extract_text_from_file(pdf_path)
-    
-    print("🔄 Chunking text and storing in database...")
-    chunks = chunk_text(extracted_text, max_tokens=500, overlap=50)
-    
-    cursor = db_conn.cursor()
-    for chunk in chunks:
-        cursor.execute(
-            "INSERT INTO chunks (document_id, chunk) VALUES (?, ?)",
-            (document_id, chunk)
-        )
-    db_conn.commit()
-    print("✅ PDF processing complete: Text extracted, chunked, and stored in DB.")
-
-
-# ---- Load Language Model ----
-def load_model(model_name: str):
-    """Load the Ollama language model."""
-    print(f"🤖 Loading model: {model_name}")
-    return OllamaLLM(model=model_name)
+from common import get_db_connection, hash_file, find_document, register_document, process_text, load_model
+from extract_text import extract_text_from_pdf
+from db_setup import init_db
 
 
 # ---- Fetch All Chunks ----
 def fetch_all_chunks(db_conn, document_id):
     """Retrieve all chunks from the database for a specific document."""
     cursor = db_conn.cursor()
+    cursor.row_factory = lambda cursor, row: row[0]
     cursor.execute("SELECT chunk FROM chunks WHERE document_id = ?", (document_id,))
-    return [row[0] for row in cursor.fetchall()]
+    return cursor.fetchall()
 
 
 # ---- Summary Prompts ----
@@ -122,59 +72,57 @@ def generate_summary(model, context, summary_type, length=None, complexity=None)
         print("❌ Invalid summary type.")
         return
     
-    final_summary = ""
+    parts = []
     for part in model.stream(prompt, temperature=0.7, top_p=0.9, max_length=2000):
         sys.stdout.write(part)
         sys.stdout.flush()
-        final_summary += part
-        time.sleep(0.05)
+        parts.append(part)
     
     print("\n✅ Final summary complete.")
-    return final_summary
+    return "".join(parts)
 
 
 # ---- Main Workflow ----
 def main():
     """Main workflow for PDF summarization."""
+    # Make sure the schema (including the TF-IDF index columns) is up to date
+    init_db()
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Step 1: File Upload and Processing
-    pdf_path = input("📂 Enter the path to your PDF file: ").strip()
-    extracted_text = extract_text_from_file(pdf_path)
-    document_hash = generate_document_hash(os.path.basename(pdf_path), extracted_text)
-    
-    cursor.execute("SELECT id FROM documents WHERE document_hash = ?", (document_hash,))
-    existing_document = cursor.fetchone()
-    
-    if existing_document:
-        document_id = existing_document['id']
-        print("✅ Document already exists in the database.")
-    else:
-        print("📄 Processing new document...")
-        cursor.execute(
-            "INSERT INTO documents (name, document_hash) VALUES (?, ?)",
-            (os.path.basename(pdf_path), document_hash)
-        )
-        document_id = cursor.lastrowid
-        process_pdf(pdf_path, conn, document_id)
-    
-    # Step 2: Fetch All Chunks and Combine
-    print("🔄 Retrieving all chunks from the database...")
-    chunks = fetch_all_chunks(conn, document_id)
-    context = " ".join(chunks)
-    print(f"✅ Retrieved {len(chunks)} chunks. Combined into a single context.")
-    
-    # Step 3: Generate Final Summary with Ollama
-    model = load_model("llama3.1")
-    summary_type = input("📊 Choose summary type (short/long/extractive/abstractive): ").strip().lower()
-    complexity = input("🎨 Choose complexity (simple/technical): ").strip().lower()
-    length = input("🔢 Enter length (if applicable, e.g., 5 lines, short, medium): ").strip()
-    
-    final_summary = generate_summary(model, context, summary_type, length, complexity)
-    print("\n📊 Final Summary:\n", final_summary)
-    
-    conn.close()
+    try:
+        # Step 1: File Upload and Processing
+        pdf_path = input("📂 Enter the path to your PDF file: ").strip()
+        document_hash = hash_file(pdf_path)
+        
+        document_id = find_document(conn, document_hash)
+        if document_id is None:
+            print("📄 Processing new document...")
+            extracted_text = extract_text_from_pdf(pdf_path)
+            document_id, is_new = register_document(conn, os.path.basename(pdf_path), document_hash)
+            if is_new:
+                process_text(extracted_text, conn, document_id)
+            conn.commit()
+        else:
+            print("✅ Document already exists in the database.")
+        
+        # Step 2: Fetch All Chunks and Combine
+        print("🔄 Retrieving all chunks from the database...")
+        chunks = fetch_all_chunks(conn, document_id)
+        context = " ".join(chunks)
+        print(f"✅ Retrieved {len(chunks)} chunks. Combined into a single context.")
+        
+        # Step 3: Generate Final Summary with Ollama
+        model = load_model("llama3.1")
+        summary_type = input("📊 Choose summary type (short/long/extractive/abstractive): ").strip().lower()
+        complexity = input("🎨 Choose complexity (simple/technical): ").strip().lower()
+        length = input("🔢 Enter length (if applicable, e.g., 5 lines, short, medium): ").strip()
+        
+        final_summary = generate_summary(model, context, summary_type, length, complexity)
+        print("\n📊 Final Summary:\n", final_summary)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
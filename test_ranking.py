@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from common import build_tfidf_index
+from main_call import _top_k_indices, rank_chunks_by_similarity, rank_chunks_with_index
+
+CORPUS = [
+    "Machine learning is a field of artificial intelligence that learns patterns from data.",
+    "Supervised learning trains a model on labelled examples to predict an output.",
+    "Unsupervised learning finds structure such as clusters in unlabelled data.",
+    "Neural networks are layers of connected units trained with backpropagation.",
+    "Decision trees split the data on feature thresholds to make predictions.",
+    "Gradient boosting combines many weak decision trees into a strong model.",
+    "Reinforcement learning agents learn by receiving rewards from an environment.",
+    "Overfitting happens when a model memorises the training data instead of generalising.",
+    "Cross-validation estimates how well a model will perform on unseen data.",
+    "Feature scaling puts inputs on a comparable range before training.",
+]
+
+QUERIES = [
+    "what is supervised learning",
+    "how do decision trees make predictions",
+    "training neural networks",
+    "model performance on unseen data",
+    "quantum chromodynamics",
+]
+
+
+def old_top_k(scores, top_k):
+    """The ranking used before the argpartition change: a full argsort."""
+    return scores.argsort()[-top_k:][::-1]
+
+
+def old_scores(query, chunks):
+    """Cosine similarity of the query against chunks, with TF-IDF fitted on both."""
+    tfidf = TfidfVectorizer().fit_transform([query] + chunks)
+    return cosine_similarity(tfidf[0:1], tfidf[1:]).flatten()
+
+
+def selected_scores(scores, chunks, ranked):
+    """Scores of the ranked chunks, in the order they were returned."""
+    return [scores[chunks.index(chunk)] for chunk in ranked]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("top_k", [1, 3, 5])
+def test_rank_chunks_by_similarity_matches_old_ranking(query, top_k):
+    scores = old_scores(query, CORPUS)
+    ranked = rank_chunks_by_similarity(query, CORPUS, top_k=top_k)
+
+    # Same scores in the same order; only chunks with tied scores may swap places
+    expected = scores[old_top_k(scores, top_k)]
+    np.testing.assert_allclose(selected_scores(scores, CORPUS, ranked), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("top_k", [1, 3, 5])
+def test_rank_chunks_with_index_matches_old_ranking(query, top_k):
+    vectorizer, chunk_matrix = build_tfidf_index(CORPUS)
+    scores = cosine_similarity(vectorizer.transform([query]), chunk_matrix).flatten()
+    ranked = rank_chunks_with_index(query, CORPUS, vectorizer, chunk_matrix, top_k=top_k)
+
+    expected = scores[old_top_k(scores, top_k)]
+    np.testing.assert_allclose(selected_scores(scores, CORPUS, ranked), expected)
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 7, 20])
+def test_top_k_indices_matches_argsort_with_ties(top_k):
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=20).astype(float)
+
+    indices = _top_k_indices(scores, top_k)
+
+    np.testing.assert_array_equal(scores[indices], scores[old_top_k(scores, top_k)])
+
+
+@pytest.mark.parametrize("top_k", [0, -1])
+def test_non_positive_top_k_returns_nothing(top_k):
+    vectorizer, chunk_matrix = build_tfidf_index(CORPUS)
+
+    assert _top_k_indices(np.array([0.3, 0.1, 0.2]), top_k).size == 0
+    assert rank_chunks_by_similarity(QUERIES[0], CORPUS, top_k=top_k) == []
+    assert rank_chunks_with_index(QUERIES[0], CORPUS, vectorizer, chunk_matrix, top_k=top_k) == []
+
+
+def test_top_k_larger_than_corpus_returns_every_chunk_best_first():
+    vectorizer, chunk_matrix = build_tfidf_index(CORPUS)
+    query = QUERIES[0]
+    scores = cosine_similarity(vectorizer.transform([query]), chunk_matrix).flatten()
+
+    ranked = rank_chunks_with_index(query, CORPUS, vectorizer, chunk_matrix, top_k=len(CORPUS) + 5)
+    assert sorted(ranked) == sorted(CORPUS)
+    np.testing.assert_allclose(selected_scores(scores, CORPUS, ranked), np.sort(scores)[::-1])
+
+    ranked = rank_chunks_by_similarity(query, CORPUS, top_k=len(CORPUS) + 5)
+    assert sorted(ranked) == sorted(CORPUS)
+    np.testing.assert_allclose(
+        selected_scores(old_scores(query, CORPUS), CORPUS, ranked),
+        np.sort(old_scores(query, CORPUS))[::-1],
+    )